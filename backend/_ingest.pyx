@@ -0,0 +1,378 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+"""Bucle de ingesta UDP en C.
+
+recvmmsg(2) y la validación del JSON (con extracción de 'lat', 'lon' y 'time'
+del objeto raíz) se ejecutan sin el GIL; solo se toma para construir las filas
+y encolarlas. Acepta y rechaza exactamente lo mismo que app.parse_location;
+los pocos casos que no resuelve en C (claves con escapes, enteros enormes,
+escapes de surrogates, anidamiento profundo) se delegan en ella. Compilar con:
+
+    python setup.py build_ext --inplace
+"""
+from libc.errno cimport errno, EINTR
+from libc.math cimport isfinite
+from libc.stdlib cimport malloc, free, strtod
+from libc.string cimport memcmp, memcpy, memset
+
+cdef extern from "sys/uio.h":
+    struct iovec:
+        void *iov_base
+        size_t iov_len
+
+cdef extern from "sys/socket.h":
+    struct msghdr:
+        void *msg_name
+        unsigned int msg_namelen
+        iovec *msg_iov
+        size_t msg_iovlen
+        void *msg_control
+        size_t msg_controllen
+        int msg_flags
+
+    struct mmsghdr:
+        msghdr msg_hdr
+        unsigned int msg_len
+
+    int recvmmsg(int sockfd, mmsghdr *msgvec, unsigned int vlen, int flags, void *timeout) nogil
+    int MSG_WAITFORONE
+
+cdef enum:
+    SCAN_REJECT = 0
+    SCAN_OK = 1
+    SCAN_UNSURE = 2     # lo decide app.parse_location
+
+cdef enum:
+    MAX_DEPTH = 64
+    MAX_NUMBER_LEN = 63
+    MAX_EXACT_INT_DIGITS = 18   # enteros más largos pueden no caber en 64 bits
+
+# 9999-12-31T23:59:59.999Z en milisegundos (app.MAX_APP_TIME_MS)
+cdef double MAX_APP_TIME_MS = 253402300799999.0
+
+cdef enum:
+    FOUND_LAT = 1
+    FOUND_LON = 2
+    FOUND_TIME = 4
+    FOUND_ALL = 7
+
+cdef struct Fix:
+    double lat
+    double lon
+    double time_ms
+    int status
+
+cdef struct Cursor:
+    # buf termina en NUL (centinela): ningún carácter válido es 0, así que
+    # basta con comparar el carácter actual para no salirse de los n bytes
+    const char *buf
+    Py_ssize_t n
+    Py_ssize_t i
+    int status
+
+cdef inline void skip_ws(Cursor *c) noexcept nogil:
+    cdef char ch = c.buf[c.i]
+    while ch == c' ' or ch == c'\t' or ch == c'\n' or ch == c'\r':
+        c.i += 1
+        ch = c.buf[c.i]
+
+cdef inline bint fail(Cursor *c, int status) noexcept nogil:
+    c.status = status
+    return False
+
+cdef inline int hex_value(char ch) noexcept nogil:
+    if c'0' <= ch <= c'9':
+        return ch - c'0'
+    if c'a' <= ch <= c'f':
+        return ch - c'a' + 10
+    if c'A' <= ch <= c'F':
+        return ch - c'A' + 10
+    return -1
+
+cdef bint parse_string(Cursor *c, bint *escaped) noexcept nogil:
+    """c.i apunta a la comilla inicial; deja c.i tras la comilla final."""
+    cdef unsigned char ch
+    cdef int k, h, code
+    c.i += 1
+    while True:
+        if c.i >= c.n:
+            return fail(c, SCAN_REJECT)
+        ch = <unsigned char> c.buf[c.i]
+        if ch == c'"':
+            c.i += 1
+            return True
+        if ch < 0x20:
+            return fail(c, SCAN_REJECT)
+        if ch == c'\\':
+            escaped[0] = True
+            ch = <unsigned char> c.buf[c.i + 1]
+            if ch == c'u':
+                code = 0
+                for k in range(4):
+                    h = hex_value(c.buf[c.i + 2 + k])
+                    if h < 0:
+                        return fail(c, SCAN_REJECT)
+                    code = code * 16 + h
+                if 0xD800 <= code <= 0xDFFF:
+                    return fail(c, SCAN_UNSURE)
+                c.i += 6
+            elif (ch == c'"' or ch == c'\\' or ch == c'/' or ch == c'b' or ch == c'f'
+                    or ch == c'n' or ch == c'r' or ch == c't'):
+                c.i += 2
+            else:
+                return fail(c, SCAN_REJECT)
+        else:
+            c.i += 1
+
+cdef inline bint is_digit(char ch) noexcept nogil:
+    return c'0' <= ch <= c'9'
+
+cdef bint parse_number(Cursor *c, double *out) noexcept nogil:
+    """Número con la gramática estricta de JSON (sin nan, inf ni hexadecimales)."""
+    cdef Py_ssize_t start = c.i, int_digits = 0
+    cdef bint is_integer = True
+    cdef char tmp[MAX_NUMBER_LEN + 1]
+    cdef double value
+    if c.buf[c.i] == c'-':
+        c.i += 1
+    if c.buf[c.i] == c'0':
+        c.i += 1
+        int_digits = 1
+    elif is_digit(c.buf[c.i]):
+        while is_digit(c.buf[c.i]):
+            c.i += 1
+            int_digits += 1
+    else:
+        return fail(c, SCAN_REJECT)
+    if c.buf[c.i] == c'.':
+        is_integer = False
+        c.i += 1
+        if not is_digit(c.buf[c.i]):
+            return fail(c, SCAN_REJECT)
+        while is_digit(c.buf[c.i]):
+            c.i += 1
+    if c.buf[c.i] == c'e' or c.buf[c.i] == c'E':
+        is_integer = False
+        c.i += 1
+        if c.buf[c.i] == c'+' or c.buf[c.i] == c'-':
+            c.i += 1
+        if not is_digit(c.buf[c.i]):
+            return fail(c, SCAN_REJECT)
+        while is_digit(c.buf[c.i]):
+            c.i += 1
+    if is_integer and int_digits > MAX_EXACT_INT_DIGITS:
+        return fail(c, SCAN_UNSURE)
+    if c.i - start > MAX_NUMBER_LEN:
+        return fail(c, SCAN_UNSURE)
+    # Copia acotada: strtod no debe seguir leyendo más allá del número
+    memcpy(tmp, c.buf + start, c.i - start)
+    tmp[c.i - start] = 0
+    value = strtod(tmp, NULL)
+    if not isfinite(value):
+        return fail(c, SCAN_REJECT)
+    if out != NULL:
+        out[0] = value
+    return True
+
+cdef bint parse_literal(Cursor *c, const char *lit, Py_ssize_t size) noexcept nogil:
+    if c.n - c.i < size or memcmp(c.buf + c.i, lit, size) != 0:
+        return fail(c, SCAN_REJECT)
+    c.i += size
+    return True
+
+cdef bint parse_value(Cursor *c, int depth) noexcept nogil:
+    cdef char ch = c.buf[c.i]
+    cdef bint escaped = False
+    if ch == c'{':
+        return parse_object(c, depth + 1, NULL)
+    if ch == c'[':
+        return parse_array(c, depth + 1)
+    if ch == c'"':
+        return parse_string(c, &escaped)
+    if ch == c'-' or is_digit(ch):
+        return parse_number(c, NULL)
+    if ch == c't':
+        return parse_literal(c, b"true", 4)
+    if ch == c'f':
+        return parse_literal(c, b"false", 5)
+    if ch == c'n':
+        return parse_literal(c, b"null", 4)
+    return fail(c, SCAN_REJECT)
+
+cdef bint parse_array(Cursor *c, int depth) noexcept nogil:
+    if depth > MAX_DEPTH:
+        return fail(c, SCAN_UNSURE)
+    c.i += 1
+    skip_ws(c)
+    if c.buf[c.i] == c']':
+        c.i += 1
+        return True
+    while True:
+        if not parse_value(c, depth):
+            return False
+        skip_ws(c)
+        if c.buf[c.i] == c',':
+            c.i += 1
+            skip_ws(c)
+        elif c.buf[c.i] == c']':
+            c.i += 1
+            return True
+        else:
+            return fail(c, SCAN_REJECT)
+
+cdef bint parse_object(Cursor *c, int depth, Fix *fix) noexcept nogil:
+    """Valida un objeto; en el objeto raíz (fix != NULL) extrae los campos."""
+    cdef Py_ssize_t kstart, klen
+    cdef bint escaped
+    cdef int found = 0, bit
+    cdef double *target
+    if depth > MAX_DEPTH:
+        return fail(c, SCAN_UNSURE)
+    c.i += 1
+    skip_ws(c)
+    if c.buf[c.i] == c'}':
+        c.i += 1
+        return True if fix == NULL else fail(c, SCAN_REJECT)
+    while True:
+        if c.buf[c.i] != c'"':
+            return fail(c, SCAN_REJECT)
+        kstart = c.i + 1
+        escaped = False
+        if not parse_string(c, &escaped):
+            return False
+        klen = c.i - 1 - kstart
+        skip_ws(c)
+        if c.buf[c.i] != c':':
+            return fail(c, SCAN_REJECT)
+        c.i += 1
+        skip_ws(c)
+
+        target = NULL
+        bit = 0
+        if fix != NULL:
+            if escaped:
+                # La clave podría ser "lat" escapada: que decida simdjson
+                return fail(c, SCAN_UNSURE)
+            if klen == 3 and memcmp(c.buf + kstart, b"lat", 3) == 0:
+                target = &fix.lat
+                bit = FOUND_LAT
+            elif klen == 3 and memcmp(c.buf + kstart, b"lon", 3) == 0:
+                target = &fix.lon
+                bit = FOUND_LON
+            elif klen == 4 and memcmp(c.buf + kstart, b"time", 4) == 0:
+                target = &fix.time_ms
+                bit = FOUND_TIME
+            if found & bit:
+                # Clave repetida: como simdjson, vale la primera aparición
+                target = NULL
+
+        if target != NULL:
+            if not (c.buf[c.i] == c'-' or is_digit(c.buf[c.i])):
+                # null, bool, string, objeto...: parse_location lo descarta
+                return fail(c, SCAN_REJECT)
+            if not parse_number(c, target):
+                return False
+            found |= bit
+        elif not parse_value(c, depth):
+            return False
+
+        skip_ws(c)
+        if c.buf[c.i] == c',':
+            c.i += 1
+            skip_ws(c)
+        elif c.buf[c.i] == c'}':
+            c.i += 1
+            if fix != NULL and found != FOUND_ALL:
+                return fail(c, SCAN_REJECT)
+            return True
+        else:
+            return fail(c, SCAN_REJECT)
+
+cdef void scan_fix(const char *buf, Py_ssize_t n, Fix *fix) noexcept nogil:
+    """buf[n] debe ser NUL."""
+    cdef Cursor c
+    c.buf = buf
+    c.n = n
+    c.i = 0
+    c.status = SCAN_OK
+    skip_ws(&c)
+    if c.buf[c.i] != c'{':
+        fix.status = SCAN_REJECT
+        return
+    if not parse_object(&c, 1, fix):
+        fix.status = c.status
+        return
+    skip_ws(&c)
+    if c.i != n:
+        fix.status = SCAN_REJECT
+    elif not 0 <= fix.time_ms <= MAX_APP_TIME_MS:
+        # Mismo rango que app.MAX_APP_TIME_MS
+        fix.status = SCAN_REJECT
+    else:
+        fix.status = SCAN_OK
+
+cdef object make_row(const char *buf, Py_ssize_t n, Fix *fix, object fallback):
+    """Fila como la de app.parse_location, o None."""
+    if fix.status == SCAN_UNSURE:
+        return fallback(buf[:n]) if fallback is not None else None
+    if fix.status != SCAN_OK:
+        return None
+    try:
+        full_data = buf[:n].decode('utf-8')
+    except UnicodeDecodeError:
+        return None
+    return (fix.lat, fix.lon, fix.time_ms, full_data)
+
+def parse_datagram(bytes data, object fallback=None):
+    """Versión en C de app.parse_location para un solo datagrama."""
+    cdef Fix fix
+    cdef Py_ssize_t n = len(data)
+    # bytes de Python siempre termina en NUL
+    scan_fix(data, n, &fix)
+    return make_row(data, n, &fix, fallback)
+
+def run_ingest(int fd, object queue, unsigned int batch=64, size_t size=1500, object fallback=None):
+    """Lee datagramas de fd indefinidamente y encola filas de 'locations'.
+
+    Las filas tienen la misma forma que las de app.parse_location, que
+    recibe los datagramas que el escáner no puede decidir.
+    """
+    cdef char *buffers = <char *> malloc(batch * (size + 1))
+    cdef iovec *iovecs = <iovec *> malloc(batch * sizeof(iovec))
+    cdef mmsghdr *msgs = <mmsghdr *> malloc(batch * sizeof(mmsghdr))
+    cdef Fix *fixes = <Fix *> malloc(batch * sizeof(Fix))
+    cdef unsigned int i
+    cdef int n, err
+    cdef char *buf
+    if not buffers or not iovecs or not msgs or not fixes:
+        free(buffers); free(iovecs); free(msgs); free(fixes)
+        raise MemoryError()
+
+    memset(msgs, 0, batch * sizeof(mmsghdr))
+    for i in range(batch):
+        iovecs[i].iov_base = buffers + i * (size + 1)
+        iovecs[i].iov_len = size
+        msgs[i].msg_hdr.msg_iov = &iovecs[i]
+        msgs[i].msg_hdr.msg_iovlen = 1
+
+    try:
+        while True:
+            with nogil:
+                n = recvmmsg(fd, msgs, batch, MSG_WAITFORONE, NULL)
+                err = errno
+                for i in range(<unsigned int> n if n > 0 else 0):
+                    buf = buffers + i * (size + 1)
+                    buf[msgs[i].msg_len] = 0
+                    scan_fix(buf, msgs[i].msg_len, &fixes[i])
+            if n < 0:
+                if err == EINTR:
+                    continue
+                raise OSError(err, "recvmmsg")
+            for i in range(<unsigned int> n):
+                row = make_row(buffers + i * (size + 1), msgs[i].msg_len, &fixes[i], fallback)
+                if row is not None:
+                    queue.put(row)
+    finally:
+        free(buffers)
+        free(iovecs)
+        free(msgs)
+        free(fixes)
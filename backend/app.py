@@ -1,16 +1,49 @@
 import socket
 import threading
-import json
-import psycopg2
+import queue
+import time
+import orjson
+import simdjson
+import psycopg
+from psycopg.types.json import set_json_dumps, set_json_loads
+from psycopg_pool import ConnectionPool, PoolTimeout
 import traceback
+import logging
+import logging.handlers
+import sys
 import os
-from datetime import datetime
-from flask import Flask, jsonify
+import atexit
+import ctypes
+import ctypes.util
+import platform
+import errno
+import mmap
+import struct
+import tempfile
+from datetime import datetime, timezone
+from flask import Flask, Response
 from flask_cors import CORS
 
+# Extensión opcional en Cython (python setup.py build_ext --inplace)
+try:
+    import _ingest
+except ImportError:
+    _ingest = None
+
 # --- 1. CONFIGURACIÓN CON VARIABLES DE ENTORNO ---
 HOST = os.getenv('HOST', '0.0.0.0')
 UDP_PORT = int(os.getenv('UDP_PORT', 5001))
+# Datagramas leídos por syscall con recvmmsg (solo Linux)
+UDP_RECV_BATCH = int(os.getenv('UDP_RECV_BATCH', 64))
+UDP_MAX_DATAGRAM = 1500
+# Sockets/hilos escuchando el mismo puerto con SO_REUSEPORT (el kernel reparte los datagramas)
+UDP_LISTENERS = int(os.getenv('UDP_LISTENERS', os.cpu_count() or 1))
+if not hasattr(socket, 'SO_REUSEPORT'):
+    UDP_LISTENERS = 1
+# Búfer de recepción del kernel por socket, para absorber ráfagas mientras el
+# escritor espera a la BD. Linux lo limita a net.core.rmem_max; súbelo con:
+#   sudo sysctl -w net.core.rmem_max=33554432
+UDP_RCVBUF = int(os.getenv('UDP_RCVBUF', 16 * 1024 * 1024))
 
 DB_CONFIG = {
     "dbname": os.getenv('DB_NAME', 'datos_gps'),
@@ -20,20 +53,120 @@ DB_CONFIG = {
     "port": os.getenv('DB_PORT', '5432')
 }
 
+# Tamaño del pool de conexiones a PostgreSQL
+POOL_MIN_CONN = int(os.getenv('DB_POOL_MIN', 2))
+POOL_MAX_CONN = int(os.getenv('DB_POOL_MAX', 16))
+POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 10))
+
+# Ingesta por lotes: el listener UDP encola y un hilo escritor inserta
+# hasta BATCH_MAX_ROWS filas o lo acumulado en BATCH_MAX_WAIT segundos.
+INGEST_QUEUE_SIZE = int(os.getenv('INGEST_QUEUE_SIZE', 10000))
+BATCH_MAX_ROWS = int(os.getenv('BATCH_MAX_ROWS', 200))
+BATCH_MAX_WAIT = float(os.getenv('BATCH_MAX_WAIT', 0.1))
+COPY_MIN_ROWS = int(os.getenv('COPY_MIN_ROWS', 100))
+# Commit asíncrono en la ingesta: ante una caída de PostgreSQL se pueden perder
+# los últimos lotes confirmados (aceptable para telemetría). INGEST_ASYNC_COMMIT=0 lo desactiva.
+INGEST_ASYNC_COMMIT = os.getenv('INGEST_ASYNC_COMMIT', '1') != '0'
+
+# Fichero en memoria compartida (tmpfs) donde el proceso de ingesta publica la
+# última ubicación guardada para que los workers HTTP la sirvan sin ir a la BD
+LATEST_SHM_PATH = os.getenv('LATEST_SHM_PATH', os.path.join(
+    '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(), f'pantera_latest_{UDP_PORT}'))
+# Segundos durante los que un worker reutiliza la última ubicación leída de la BD
+# (solo mientras el proceso de ingesta no ha publicado ninguna) y cada cuánto
+# se comprueba que el fichero compartido sigue siendo el mismo
+LATEST_CACHE_TTL = float(os.getenv('LATEST_CACHE_TTL', 1))
+# Segundos durante los que /api/health reutiliza el último chequeo de la BD
+HEALTH_CACHE_TTL = float(os.getenv('HEALTH_CACHE_TTL', 5))
+
+# Nivel de los logs de la ingesta UDP (DEBUG muestra cada lote guardado)
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+
 # Validar que las variables críticas estén definidas
 if not DB_CONFIG['password'] or not DB_CONFIG['host']:
     raise ValueError("❌ ERROR: DB_PASSWORD y DB_HOST deben estar definidas en las variables de entorno")
 
 # --- 2. FUNCIONES DE BASE DE DATOS Y UDP ---
 
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler que descarta mensajes si la cola está llena en vez de bloquear."""
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+class BlockingStopQueueListener(logging.handlers.QueueListener):
+    """Al parar espera hueco en la cola (acotada) para encolar el centinela."""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+# Los hilos de ingesta (y el acceso al pool) nunca escriben en stdout: encolan
+# el mensaje y un QueueListener en segundo plano hace la E/S.
+_log = logging.getLogger('pantera')
+_log.setLevel(LOG_LEVEL)
+_log.propagate = False
+LOG_QUEUE = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+_log.addHandler(DroppingQueueHandler(LOG_QUEUE))
+ingest_log = logging.getLogger('pantera.ingest')
+db_log = logging.getLogger('pantera.db')
+_log_stream = logging.StreamHandler(sys.stdout)
+_log_stream.setFormatter(logging.Formatter('%(message)s'))
+LOG_LISTENER = BlockingStopQueueListener(LOG_QUEUE, _log_stream)
+LOG_LISTENER.start()
+atexit.register(LOG_LISTENER.stop)
+
+# Pool de conexiones compartido: evita un handshake TCP+TLS+auth contra RDS
+# por cada paquete UDP y cada petición HTTP.
+POOL = None
+POOL_LOCK = threading.Lock()
+
+# Cualquier valor adaptado como Json/Jsonb (o leído de una columna JSONB) pasa por orjson
+set_json_dumps(orjson.dumps)
+set_json_loads(orjson.loads)
+
+def init_db_pool():
+    global POOL
+    with POOL_LOCK:
+        if POOL is not None:
+            return POOL
+        # prepare_threshold=0: cada conexión del pool prepara en el servidor
+        # el INSERT del UDP (y la consulta de la API) en su primera ejecución
+        # y después solo envía los parámetros (PREPARE/EXECUTE implícito).
+        POOL = ConnectionPool(
+            kwargs={**DB_CONFIG, "prepare_threshold": 0},
+            min_size=POOL_MIN_CONN,
+            max_size=POOL_MAX_CONN,
+            timeout=POOL_TIMEOUT,
+            open=True,
+        )
+        # Sin POOL.wait(): si la BD no responde, wait() cerraría el pool. Así
+        # el pool sigue reconectando en segundo plano y getconn() avisa del fallo.
+        atexit.register(POOL.close)
+        return POOL
+
 def get_db_connection():
+    pool = POOL or init_db_pool()
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        return conn
-    except psycopg2.OperationalError as e:
-        print(f"❌ CRÍTICO: No se pudo conectar a PostgreSQL. Error: {e}")
+        return pool.getconn()
+    except (psycopg.OperationalError, PoolTimeout) as e:
+        db_log.error(f"❌ CRÍTICO: No se pudo obtener una conexión a PostgreSQL. Error: {e}")
         return None
 
+def release_db_connection(conn):
+    """Devuelve la conexión al pool, cerrando antes cualquier transacción a medias
+    (p. ej. la que abre un SELECT) para que el pool no tenga que avisar de ello."""
+    try:
+        # No-op si la conexión ya está en IDLE
+        conn.rollback()
+    except psycopg.Error:
+        # Conexión rota: el pool la descarta al devolverla
+        pass
+    POOL.putconn(conn)
+
 def setup_database():
     conn = get_db_connection()
     if conn is None: 
@@ -42,7 +175,7 @@ def setup_database():
         with conn.cursor() as cur:
             cur.execute("""
                 CREATE TABLE IF NOT EXISTS locations (
-                    id SERIAL PRIMARY KEY, 
+                    id BIGSERIAL PRIMARY KEY, 
                     latitude DOUBLE PRECISION NOT NULL,
                     longitude DOUBLE PRECISION NOT NULL, 
                     app_timestamp TIMESTAMP WITH TIME ZONE,
@@ -50,121 +183,487 @@ def setup_database():
                     full_data JSONB
                 );
             """)
+            # Tablas creadas con SERIAL: pasar id y su secuencia a BIGINT para
+            # no agotar los 2^31 ids (reescribe la tabla una única vez)
+            cur.execute("""
+                DO $$
+                BEGIN
+                    IF (SELECT data_type FROM information_schema.columns
+                        WHERE table_schema = current_schema()
+                          AND table_name = 'locations' AND column_name = 'id') = 'integer' THEN
+                        ALTER TABLE locations ALTER COLUMN id TYPE BIGINT;
+                        EXECUTE format('ALTER SEQUENCE %s AS BIGINT', pg_get_serial_sequence('locations', 'id'));
+                        RAISE NOTICE 'locations.id migrado a BIGINT';
+                    END IF;
+                END $$;
+            """)
             conn.commit()
             print("✅ Tabla 'locations' verificada/creada exitosamente.")
     except Exception as e:
         print(f"❌ Error configurando base de datos: {e}")
     finally:
         if conn: 
-            conn.close()
+            release_db_connection(conn)
+
+# app_timestamp llega en milisegundos epoch y se convierte en el servidor
+INSERT_LOCATION_SQL = "INSERT INTO locations (latitude, longitude, app_timestamp, full_data) VALUES (%s, %s, to_timestamp(%s::float8 / 1000), %s);"
+# max(id) se resuelve con una sola lectura del índice de la PK
+LATEST_LOCATION_SQL = "SELECT latitude, longitude, app_timestamp FROM locations WHERE id = (SELECT max(id) FROM locations);"
+# Solo para las transacciones de ingesta: el COMMIT no espera al fsync del WAL
+ASYNC_COMMIT_SQL = "SET LOCAL synchronous_commit = off;"
+COPY_LOCATION_SQL = "COPY locations (latitude, longitude, app_timestamp, full_data) FROM STDIN"
+
+INGEST_QUEUE = queue.Queue(maxsize=INGEST_QUEUE_SIZE)
+
+class SharedLatest:
+    """Última ubicación guardada, compartida entre procesos con un mmap.
+
+    Un único escritor (el hilo escritor del proceso de ingesta) y cualquier
+    número de lectores (los workers HTTP). El contador de secuencia hace de
+    seqlock: es impar mientras se escribe, así que el lector reintenta si lo
+    ve impar o si cambió durante la lectura. Cada `recheck` segundos ambos
+    lados comprueban que el fichero no se ha borrado ni sustituido.
+    """
+    _SEQ = struct.Struct('<Q')
+    _FIX = struct.Struct('<ddd')  # lat, lon, time (ms)
+    SIZE = _SEQ.size + _FIX.size
+    _READ_ATTEMPTS = 100
+
+    def __init__(self, path, recheck=1.0):
+        self.path = path
+        self.recheck = recheck
+        self.writable = False
+        self._map = None
+        self._ino = None
+        self._checked = float('-inf')
+        self._seq = 0
+
+    def open_for_writing(self):
+        self.writable = True
+        self._checked = float('-inf')
+        self._current()
+
+    def _remap(self):
+        try:
+            if self.writable:
+                fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            else:
+                fd = os.open(self.path, os.O_RDONLY)
+        except FileNotFoundError:
+            self._map = self._ino = None
+            return
+        try:
+            st = os.fstat(fd)
+            if st.st_size < self.SIZE:
+                if not self.writable:
+                    self._map = self._ino = None
+                    return
+                # Nunca se encoge: un lector puede tenerlo mapeado
+                os.ftruncate(fd, self.SIZE)
+            access = mmap.ACCESS_WRITE if self.writable else mmap.ACCESS_READ
+            self._map, self._ino = mmap.mmap(fd, self.SIZE, access=access), st.st_ino
+        finally:
+            os.close(fd)
+        if self.writable:
+            # Continuamos la secuencia anterior (par) si el fichero ya existía
+            self._seq = self._SEQ.unpack_from(self._map)[0] & ~1
+
+    def _current(self):
+        now = time.monotonic()
+        if now - self._checked >= self.recheck:
+            self._checked = now
+            try:
+                ino = os.stat(self.path).st_ino
+            except FileNotFoundError:
+                ino = None
+            if self._map is None or ino != self._ino:
+                self._remap()
+        return self._map
+
+    def publish(self, lat, lon, app_time_ms):
+        m = self._current()
+        seq = self._seq
+        self._SEQ.pack_into(m, 0, seq + 1)
+        self._FIX.pack_into(m, self._SEQ.size, lat, lon, app_time_ms)
+        self._SEQ.pack_into(m, 0, seq + 2)
+        self._seq = seq + 2
+
+    def read(self):
+        """Devuelve (lat, lon, time) o None si aún no se ha publicado nada."""
+        m = self._current()
+        if m is None:
+            return None
+        seq_struct, fix_struct, offset = self._SEQ, self._FIX, self._SEQ.size
+        for _ in range(self._READ_ATTEMPTS):
+            seq = seq_struct.unpack_from(m)[0]
+            if seq == 0:
+                return None
+            if seq & 1:
+                continue
+            fix = fix_struct.unpack_from(m, offset)
+            if seq_struct.unpack_from(m)[0] == seq:
+                return fix
+        return None
+
+# El proceso de ingesta publica aquí cada lote guardado; /api/latest_location
+# lo lee desde cualquier proceso sin ir a la BD
+LATEST = SharedLatest(LATEST_SHM_PATH, LATEST_CACHE_TTL)
+
+# Un parser de simdjson por hilo: reutiliza su búfer interno y no es thread-safe
+_parsers = threading.local()
+
+def get_json_parser():
+    parser = getattr(_parsers, 'parser', None)
+    if parser is None:
+        parser = _parsers.parser = simdjson.Parser()
+    return parser
+
+NUMBER_TYPES = (int, float)
+# 9999-12-31T23:59:59.999Z: último instante representable con datetime
+MAX_APP_TIME_MS = 253402300799999
+
+def parse_location(raw, parser=None):
+    """Convierte un datagrama JSON en una fila de 'locations' (o None si no es válido).
+
+    El listener pasa su propio parser para no buscarlo en cada paquete.
+    """
+    try:
+        # Solo se materializan los tres campos que necesitamos
+        doc = (parser or get_json_parser()).parse(raw)
+        try:
+            lat, lon, app_time_ms = doc['lat'], doc['lon'], doc['time']
+        except KeyError:
+            return None
+        finally:
+            del doc
+        # Solo números JSON de verdad: ni null, ni bool (subclase de int), ni
+        # strings u objetos, que harían fallar el lote entero en PostgreSQL
+        if type(lat) not in NUMBER_TYPES or type(lon) not in NUMBER_TYPES or type(app_time_ms) not in NUMBER_TYPES:
+            return None
+        # Fuera de rango, PostgreSQL aceptaría el timestamp pero Python no
+        # podría convertirlo (COPY, /api/latest_location)
+        if not 0 <= app_time_ms <= MAX_APP_TIME_MS:
+            return None
+        # full_data guarda el datagrama original: PostgreSQL lo vuelve a parsear como JSONB
+        return (lat, lon, app_time_ms, raw.decode('utf-8'))
+    except Exception as e:
+        ingest_log.warning(f"❌ Error procesando datagrama: {e}")
+        return None
+
+def insert_rows(conn, rows):
+    with conn.cursor() as cur:
+        if len(rows) >= COPY_MIN_ROWS:
+            if INGEST_ASYNC_COMMIT:
+                cur.execute(ASYNC_COMMIT_SQL)
+            # Ráfagas grandes: protocolo COPY
+            # (COPY no admite expresiones: aquí el timestamp se calcula en Python)
+            with cur.copy(COPY_LOCATION_SQL) as copy:
+                for lat, lon, app_time_ms, full_data in rows:
+                    app_timestamp = datetime.fromtimestamp(app_time_ms / 1000, tz=timezone.utc)
+                    copy.write_row((lat, lon, app_timestamp, full_data))
+            conn.commit()
+        else:
+            # En modo pipeline los INSERT y el COMMIT viajan juntos
+            with conn.pipeline():
+                if INGEST_ASYNC_COMMIT:
+                    cur.execute(ASYNC_COMMIT_SQL)
+                cur.executemany(INSERT_LOCATION_SQL, rows)
+                conn.commit()
+
+def insert_row_checked(conn, row):
+    """Inserta una sola fila; devuelve False si PostgreSQL la rechaza."""
+    try:
+        insert_rows(conn, [row])
+        return True
+    except psycopg.DataError as e:
+        conn.rollback()
+        ingest_log.warning(f"❌ Datagrama descartado: {e}")
+        return False
 
-def save_location_data(data_str):
+def save_location_data(rows):
+    """Inserta un lote de filas con un único COMMIT."""
     conn = get_db_connection()
     if not conn: 
         return
     try:
-        data = json.loads(data_str)
-        lat, lon, app_time_ms = data.get('lat'), data.get('lon'), data.get('time')
-        if lat is None or lon is None or app_time_ms is None: 
-            return
-        app_timestamp = datetime.fromtimestamp(app_time_ms / 1000.0)
-        with conn.cursor() as cur:
-            cur.execute(
-                "INSERT INTO locations (latitude, longitude, app_timestamp, full_data) VALUES (%s, %s, %s, %s);",
-                (lat, lon, app_timestamp, json.dumps(data))
-            )
-            conn.commit()
-        print(f"📍 [UDP] Dato guardado en PostgreSQL: Lat {lat}, Lon {lon}")
+        try:
+            insert_rows(conn, rows)
+        except psycopg.DataError:
+            # Un datagrama con datos inválidos no debe tumbar todo el lote
+            conn.rollback()
+            rows = [row for row in rows if insert_row_checked(conn, row)]
+            if not rows:
+                return
+        lat, lon, app_time_ms = rows[-1][0], rows[-1][1], rows[-1][2]
+        LATEST.publish(lat, lon, app_time_ms)
+        if ingest_log.isEnabledFor(logging.DEBUG):
+            ingest_log.debug(f"📍 [UDP] {len(rows)} dato(s) guardado(s) en PostgreSQL. Último: Lat {lat}, Lon {lon}")
     except Exception as e:
-        print(f"❌ Error guardando datos: {e}")
-        traceback.print_exc()
+        ingest_log.exception(f"❌ Error guardando datos: {e}")
     finally:
         if conn: 
-            conn.close()
+            release_db_connection(conn)
+
+def location_writer():
+    """Vacía la cola de ingesta en lotes hacia PostgreSQL."""
+    while True:
+        rows = [INGEST_QUEUE.get()]
+        deadline = time.monotonic() + BATCH_MAX_WAIT
+        while len(rows) < BATCH_MAX_ROWS:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                rows.append(INGEST_QUEUE.get(timeout=remaining))
+            except queue.Empty:
+                break
+        save_location_data(rows)
 
-def udp_listener():
+# --- Lectura por lotes con recvmmsg(2) vía ctypes ---
+
+MSG_WAITFORONE = 0x10000
+
+class _IoVec(ctypes.Structure):
+    _fields_ = [("iov_base", ctypes.c_void_p), ("iov_len", ctypes.c_size_t)]
+
+class _MsgHdr(ctypes.Structure):
+    _fields_ = [
+        ("msg_name", ctypes.c_void_p),
+        ("msg_namelen", ctypes.c_uint32),
+        ("msg_iov", ctypes.POINTER(_IoVec)),
+        ("msg_iovlen", ctypes.c_size_t),
+        ("msg_control", ctypes.c_void_p),
+        ("msg_controllen", ctypes.c_size_t),
+        ("msg_flags", ctypes.c_int),
+    ]
+
+class _MMsgHdr(ctypes.Structure):
+    _fields_ = [("msg_hdr", _MsgHdr), ("msg_len", ctypes.c_uint)]
+
+def _load_recvmmsg():
+    if platform.system() != 'Linux':
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        recvmmsg = libc.recvmmsg
+    except (OSError, AttributeError):
+        return None
+    recvmmsg.argtypes = [ctypes.c_int, ctypes.POINTER(_MMsgHdr), ctypes.c_uint, ctypes.c_int, ctypes.c_void_p]
+    recvmmsg.restype = ctypes.c_int
+    return recvmmsg
+
+_recvmmsg = _load_recvmmsg()
+
+class BatchReceiver:
+    """Recibe hasta UDP_RECV_BATCH datagramas por syscall en búferes preasignados."""
+
+    def __init__(self, sock, batch=UDP_RECV_BATCH, size=UDP_MAX_DATAGRAM):
+        self.fd = sock.fileno()
+        self.batch = batch
+        self.buffers = [ctypes.create_string_buffer(size) for _ in range(batch)]
+        self.iovecs = (_IoVec * batch)()
+        self.msgs = (_MMsgHdr * batch)()
+        for i, buf in enumerate(self.buffers):
+            self.iovecs[i].iov_base = ctypes.addressof(buf)
+            self.iovecs[i].iov_len = size
+            self.msgs[i].msg_hdr.msg_iov = ctypes.pointer(self.iovecs[i])
+            self.msgs[i].msg_hdr.msg_iovlen = 1
+
+    def recv(self):
+        while True:
+            n = _recvmmsg(self.fd, self.msgs, self.batch, MSG_WAITFORONE, None)
+            if n >= 0:
+                break
+            err = ctypes.get_errno()
+            if err != errno.EINTR:
+                raise OSError(err, os.strerror(err))
+        return [ctypes.string_at(self.iovecs[i].iov_base, self.msgs[i].msg_len) for i in range(n)]
+
+def is_cooperative(sock):
+    # Con gevent (Gunicorn) una llamada bloqueante en C congelaría el hub:
+    # hay que usar el recvfrom cooperativo del socket parcheado.
+    return type(sock).__module__.startswith('gevent')
+
+def make_receiver(sock):
+    """Devuelve una función que lee el siguiente lote de datagramas del socket."""
+    if _recvmmsg is not None and not is_cooperative(sock):
+        return BatchReceiver(sock).recv
+
+    # Un datagrama por llamada sobre un búfer reutilizado; solo se copia
+    # el tamaño real recibido
+    buf = bytearray(UDP_MAX_DATAGRAM)
+    view = memoryview(buf)
+
+    def recv():
+        n, _ = sock.recvfrom_into(buf)
+        return [view[:n].tobytes()]
+    return recv
+
+def udp_listener(idx=0):
     try:
         with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            if UDP_LISTENERS > 1:
+                s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
             s.bind((HOST, UDP_PORT))
-            print(f"🚀 Servidor UDP (Sniffer) escuchando en {HOST}:{UDP_PORT}...")
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, UDP_RCVBUF)
+            rcvbuf = s.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+            ingest_log.info(f"🚀 Servidor UDP (Sniffer #{idx}) escuchando en {HOST}:{UDP_PORT} (SO_RCVBUF {rcvbuf} bytes)...")
+            if _ingest is not None and not is_cooperative(s):
+                # recvmmsg + validación y extracción de campos en C, sin el GIL;
+                # los casos dudosos los resuelve parse_location
+                _ingest.run_ingest(s.fileno(), INGEST_QUEUE, UDP_RECV_BATCH, UDP_MAX_DATAGRAM, parse_location)
+                return
+            receive = make_receiver(s)
+            # Referencias locales para el bucle caliente
+            parse, parser, put = parse_location, get_json_parser(), INGEST_QUEUE.put
             while True:
-                data, _ = s.recvfrom(1024)
-                if data:
-                    save_location_data(data.decode('utf-8'))
+                for data in receive():
+                    if data:
+                        row = parse(data, parser)
+                        if row:
+                            put(row)
     except Exception as e:
-        print(f"❌ Error en UDP listener: {e}")
-        traceback.print_exc()
+        ingest_log.exception(f"❌ Error en UDP listener: {e}")
 
 # --- 3. INICIALIZACIÓN DE LA APLICACIÓN FLASK ---
 
 app = Flask(__name__)
 CORS(app)
 
-@app.route('/api/latest_location', methods=['GET'])
-def get_latest_location():
+def json_response(obj):
+    """Equivalente a jsonify serializando con orjson."""
+    return Response(orjson.dumps(obj), mimetype='application/json')
+
+# Última respuesta de la BD para /api/latest_location mientras no hay nada publicado
+_LATEST_DB = {'ts': float('-inf'), 'response': None}
+_LATEST_DB_LOCK = threading.Lock()
+
+def query_latest_location():
     conn = get_db_connection()
     if not conn: 
-        return jsonify({"error": "No se pudo conectar a la base de datos"}), 500
+        return {"error": "No se pudo conectar a la base de datos"}, 500
     try:
         with conn.cursor() as cur:
-            cur.execute("SELECT latitude, longitude, app_timestamp FROM locations ORDER BY id DESC LIMIT 1;")
+            cur.execute(LATEST_LOCATION_SQL)
             latest_record = cur.fetchone()
         if latest_record:
-            return jsonify({
+            return {
                 "latitude": latest_record[0], 
                 "longitude": latest_record[1],
                 "timestamp": latest_record[2].isoformat()
-            })
+            }, 200
         else:
-            return jsonify({"message": "Esperando la primera transmisión de datos..."}), 404
+            return {"message": "Esperando la primera transmisión de datos..."}, 404
     except Exception as e:
         print(f"❌ Error consultando base de datos: {e}")
         traceback.print_exc()
-        return jsonify({"error": "Error al consultar la base de datos"}), 500
+        return {"error": "Error al consultar la base de datos"}, 500
     finally:
         if conn: 
-            conn.close()
+            release_db_connection(conn)
 
-@app.route('/api/health', methods=['GET'])
-def health_check():
-    """Endpoint para verificar salud del servicio"""
+@app.route('/api/latest_location', methods=['GET'])
+def get_latest_location():
+    latest = LATEST.read()
+    if latest is not None:
+        lat, lon, ts = latest
+        try:
+            timestamp = datetime.fromtimestamp(ts / 1000, tz=timezone.utc).isoformat()
+        except (ValueError, OverflowError, OSError):
+            timestamp = None
+        if timestamp is not None:
+            return json_response({
+                "latitude": lat,
+                "longitude": lon,
+                "timestamp": timestamp
+            })
+
+    # El proceso de ingesta aún no ha guardado nada desde que se creó el
+    # fichero compartido (p. ej. tras reiniciar la máquina): consultamos la BD,
+    # compartiendo el resultado durante LATEST_CACHE_TTL segundos
+    with _LATEST_DB_LOCK:
+        now = time.monotonic()
+        if now - _LATEST_DB['ts'] >= LATEST_CACHE_TTL:
+            _LATEST_DB['response'] = query_latest_location()
+            _LATEST_DB['ts'] = now
+        body, status = _LATEST_DB['response']
+    return json_response(body), status
+
+# Resultado del último chequeo de la BD: las sondas de salud no consultan
+# PostgreSQL más de una vez cada HEALTH_CACHE_TTL segundos
+_HEALTH = {'ts': float('-inf'), 'response': None}
+_HEALTH_LOCK = threading.Lock()
+
+def check_database():
+    """Valida una conexión del pool con un SELECT 1."""
     try:
         conn = get_db_connection()
-        if conn:
-            conn.close()
-            return jsonify({"status": "healthy", "database": "connected"}), 200
-        else:
-            return jsonify({"status": "unhealthy", "database": "disconnected"}), 500
+        if not conn:
+            return {"status": "unhealthy", "database": "disconnected"}, 500
+        try:
+            conn.execute("SELECT 1")
+        finally:
+            release_db_connection(conn)
+        return {"status": "healthy", "database": "connected"}, 200
     except Exception as e:
-        return jsonify({"status": "unhealthy", "error": str(e)}), 500
+        return {"status": "unhealthy", "error": str(e)}, 500
+
+@app.route('/api/health', methods=['GET'])
+def health_check():
+    """Endpoint para verificar salud del servicio"""
+    with _HEALTH_LOCK:
+        now = time.monotonic()
+        if now - _HEALTH['ts'] >= HEALTH_CACHE_TTL:
+            _HEALTH['response'] = check_database()
+            _HEALTH['ts'] = now
+        body, status = _HEALTH['response']
+    return json_response(body), status
 
 # --- 4. ARRANQUE DE SERVICIOS ---
 
+def start_background_services():
+    """Prepara la tabla y arranca el escritor y el sniffer UDP en segundo plano.
+
+    Debe ejecutarse en un único proceso: con Gunicorn es ingest.py, que el
+    master lanza desde gunicorn.conf.py. Devuelve los hilos arrancados para
+    que el llamador detecte si alguno termina (p. ej. un sniffer que no pudo
+    abrir el puerto).
+    """
+    # Verificamos y creamos la tabla al iniciar
+    setup_database()
+    LATEST.open_for_writing()
+
+    # Iniciamos el hilo escritor y los sniffers UDP en segundo plano;
+    # todos los sniffers alimentan la misma cola del escritor.
+    writer_thread = threading.Thread(target=location_writer, name='location-writer', daemon=True)
+    writer_thread.start()
+    # Con gevent los sniffers serían greenlets en un único hilo: repartir el
+    # tráfico entre varios sockets no aportaría paralelismo
+    listeners = 1 if socket.socket.__module__.startswith('gevent') else UDP_LISTENERS
+    threads = [writer_thread]
+    for idx in range(listeners):
+        udp_thread = threading.Thread(target=udp_listener, args=(idx,), name=f'udp-listener-{idx}', daemon=True)
+        udp_thread.start()
+        threads.append(udp_thread)
+    return threads
+
 if __name__ == '__main__':
     print(f"🔧 Configuración:")
     print(f"   Host: {HOST}")
-    print(f"   Puerto UDP: {UDP_PORT}")
+    print(f"   Puerto UDP: {UDP_PORT} ({UDP_LISTENERS} listener(s))")
     print(f"   Base de datos: {DB_CONFIG['user']}@{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['dbname']}")
     
-    # Verificamos y creamos la tabla al iniciar
-    setup_database()
-
-    # Iniciamos el hilo del sniffer UDP en segundo plano
-    udp_thread = threading.Thread(target=udp_listener, daemon=True)
-    udp_thread.start()
+    start_background_services()
     
-    # Para desarrollo local
+    # Para desarrollo local (en producción: gunicorn -c gunicorn.conf.py app:app)
     app.run(host='0.0.0.0', port=8000, debug=False)
 else:
     # Para producción con Gunicorn
     print(f"🚀 Iniciando en modo producción...")
     print(f"   Host: {HOST}")
-    print(f"   Puerto UDP: {UDP_PORT}")
+    print(f"   Puerto UDP: {UDP_PORT} ({UDP_LISTENERS} listener(s))")
     print(f"   Base de datos: {DB_CONFIG['user']}@{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['dbname']}")
     
-    # Verificamos y creamos la tabla al iniciar
-    setup_database()
-
-    # Iniciamos el hilo del sniffer UDP en segundo plano
-    udp_thread = threading.Thread(target=udp_listener, daemon=True)
-    udp_thread.start()
\ No newline at end of file
+    # Con gunicorn.conf.py la ingesta UDP corre en su propio proceso (ingest.py)
+    if not os.getenv('UDP_INGEST_MANAGED'):
+        start_background_services()
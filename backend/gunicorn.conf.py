@@ -0,0 +1,69 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+
+# --- Configuración de Gunicorn (se carga automáticamente desde este directorio) ---
+# Workers asíncronos con gevent: cada worker atiende muchas conexiones HTTP
+# sin un hilo por petición. Los workers solo sirven la API.
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('GUNICORN_WORKERS', 4))
+worker_class = 'gevent'
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 1000))
+
+# Indica a app.py que no arranque la ingesta UDP al importarse: corre en un
+# proceso propio (ingest.py), sin gevent, que el master lanza y supervisa.
+os.environ['UDP_INGEST_MANAGED'] = '1'
+
+INGEST_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ingest.py')
+INGEST_RESTART_DELAY = 1
+
+# Gunicorn vuelve a ejecutar este fichero en cada reload (HUP): el proceso de
+# ingesta, la marca de parada y su lock se guardan en el Arbiter, que sí
+# sobrevive. El lock evita lanzar un hijo que on_exit ya no vería.
+
+def _supervise_ingest(server):
+    while True:
+        with server.ingest_lock:
+            if server.ingest_stopping:
+                break
+            proc = server.ingest_proc = subprocess.Popen([sys.executable, INGEST_SCRIPT])
+        server.log.info("Proceso de ingesta UDP arrancado (pid %s)", proc.pid)
+        # (el master de Gunicorn también recoge hijos: si se adelanta, wait() devuelve 0)
+        code = proc.wait()
+        if server.ingest_stopping:
+            break
+        server.log.error("El proceso de ingesta UDP terminó (código %s); reiniciando", code)
+        time.sleep(INGEST_RESTART_DELAY)
+
+def _terminate_ingest(server):
+    proc = server.ingest_proc
+    if proc is not None and proc.poll() is None:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+def when_ready(server):
+    # Solo se llama una vez al arrancar el master (no en cada reload por HUP)
+    server.ingest_lock = threading.Lock()
+    server.ingest_stopping = False
+    server.ingest_proc = None
+    threading.Thread(target=_supervise_ingest, args=(server,), daemon=True).start()
+
+def on_reload(server):
+    if not hasattr(server, 'ingest_lock'):
+        return
+    # El supervisor lo relanza enseguida con el código y la configuración nuevos
+    server.log.info("Reload: reiniciando el proceso de ingesta UDP")
+    with server.ingest_lock:
+        _terminate_ingest(server)
+
+def on_exit(server):
+    if not hasattr(server, 'ingest_lock'):
+        return
+    with server.ingest_lock:
+        server.ingest_stopping = True
+        _terminate_ingest(server)
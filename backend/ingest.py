@@ -0,0 +1,25 @@
+"""Proceso de ingesta UDP: tabla, hilo escritor y sniffers.
+
+Corre sin gevent para que recvmmsg, la extensión _ingest y los sniffers con
+SO_REUSEPORT usen hilos reales. gunicorn.conf.py lo lanza desde el master;
+también se puede ejecutar a mano (python ingest.py) o como servicio propio.
+"""
+import os
+import sys
+import time
+
+# app.py no debe arrancar la ingesta al importarse: la arrancamos aquí
+os.environ['UDP_INGEST_MANAGED'] = '1'
+
+import app
+
+if __name__ == '__main__':
+    threads = app.start_background_services()
+    # Los servicios son hilos daemon: mantenemos vivo el proceso mientras
+    # sigan todos en marcha. udp_listener registra el error y retorna, así que
+    # salimos con error para que el supervisor (gunicorn.conf.py) nos relance.
+    while all(t.is_alive() for t in threads):
+        time.sleep(1)
+    dead = [t.name for t in threads if not t.is_alive()]
+    app.ingest_log.error(f"❌ Hilo(s) de ingesta detenido(s): {', '.join(dead)}; saliendo")
+    sys.exit(1)
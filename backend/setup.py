@@ -0,0 +1,14 @@
+# Compila la extensión opcional de ingesta UDP:
+#   pip install -r requirements-build.txt
+#   python setup.py build_ext --inplace
+# Si no está compilada, app.py usa el bucle en Python.
+from setuptools import setup, Extension
+from Cython.Build import cythonize
+
+setup(
+    name="pantera-ingest",
+    ext_modules=cythonize(
+        [Extension("_ingest", ["_ingest.pyx"], define_macros=[("_GNU_SOURCE", None)])],
+        language_level=3,
+    ),
+)
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# app.py exige estas variables al importarse; los tests no abren conexiones
+os.environ.setdefault('DB_PASSWORD', 'test')
+os.environ.setdefault('DB_HOST', '127.0.0.1')
+os.environ['UDP_INGEST_MANAGED'] = '1'
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
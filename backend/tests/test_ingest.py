@@ -0,0 +1,113 @@
+"""La extensión _ingest debe aceptar y rechazar lo mismo que app.parse_location."""
+import queue
+import socket
+import threading
+
+import pytest
+
+_ingest = pytest.importorskip('_ingest', reason="extensión no compilada (python setup.py build_ext --inplace)")
+import app
+
+VALID = [
+    b'{"lat": 4.60971, "lon": -74.08175, "time": 1700000000000}',
+    b'{"lat":1,"lon":2,"time":3}',
+    b' \n{"time": 1.5e12, "lon": -0.0, "lat": 1E-3}\t\r\n',
+    b'{"name": "lat", "lat": 7, "lon": 8, "time": 9}',
+    b'{"latitude": 1, "lat": 7, "lon": 8, "time": 9, "extra": {"lat": "x"}}',
+    b'{"lat": 1, "lat": 2, "lon": 3, "time": 4}',
+    b'{"meta": {"lat": 99, "deep": [1, [2, {"a": null}]]}, "lat": 1, "lon": 2, "time": 3}',
+    b'{"lat": 1, "lon": 2, "time": 3, "s": "caf\xc3\xa9 \\"lat\\": 5 \\u00e9"}',
+    b'{"lat": 1e-400, "lon": 2, "time": 3}',
+]
+
+MALFORMED = [
+    b'',
+    b'garbage',
+    b'[1, 2, 3]',
+    b'42',
+    b'{}',
+    b'{"lat": 1, "lon": 2}',
+    b'{"lat": 1, "lon": 2, "time": 3',
+    b'{"lat": 1, "lon": 2, "time": 3,}',
+    b'{"lat": 1, "lon": 2, "time": 3} trailing',
+    b'{"lat": 1, "lon": 2, "time": 3}\x00',
+    b'{"lat": 01, "lon": 2, "time": 3}',
+    b'{"lat": 1., "lon": 2, "time": 3}',
+    b'{"lat": .5, "lon": 2, "time": 3}',
+    b'{"lat": +1, "lon": 2, "time": 3}',
+    b'{"lat": 1, "lon": 2, "time": 3, "s": "\\x"}',
+    b'{"lat": 1, "lon": 2, "time": 3, "s": "a\x01b"}',
+    b'{"lat": 1, "lon": 2, "time": 3, "s": "\xff"}',
+    b'{"lat": 1, "lon": 2, "time": 3, "x": tru}',
+]
+
+HOSTILE = [
+    b'{"lat": null, "lon": 2, "time": 3}',
+    b'{"lat": true, "lon": 2, "time": 3}',
+    b'{"lat": {}, "lon": 2, "time": 3}',
+    b'{"lat": [1], "lon": 2, "time": 3}',
+    b'{"lat": "1", "lon": 2, "time": 3}',
+    b'{"lat": nan, "lon": 2, "time": 3}',
+    b'{"lat": NaN, "lon": 2, "time": 3}',
+    b'{"lat": inf, "lon": 2, "time": 3}',
+    b'{"lat": -Infinity, "lon": 2, "time": 3}',
+    b'{"lat": 0x1p3, "lon": 2, "time": 3}',
+    b'{"lat": 1e400, "lon": 2, "time": 3}',
+    b'{"lat": 1, "lon": 2, "time": 3, "x": -1e400}',
+    b'{"lat": 1, "lon": 2, "time": 123456789012345678901234}',
+    b'{"lat": 18446744073709551615, "lon": 2, "time": 3}',
+    b'{"lat": 1, "lon": 2, "time": 3, "x": -9223372036854775809}',
+    b'{"l\\u0061t": 1, "lon": 2, "time": 3}',
+    b'{"lat": 1, "lon": 2, "time": 3, "s": "\\ud83d\\ude00"}',
+    b'{"lat": 1, "lon": 2, "time": 3, "s": "\\ud800"}',
+    b'{"lat": 1, "lon": 2, "time": 3, "d": ' + b'[' * 100 + b']' * 100 + b'}',
+    b'{"lat": 1, "lon": 2, "time": 3, "d": ' + b'[' * 100 + b'}',
+    b'{"lat": 1, "lon": 2, "time": 1e15}',
+    b'{"lat": 1, "lon": 2, "time": -1}',
+    b'{"lat": 1, "lon": 2, "time": 253402300799999}',
+    b'{"lat": 1, "lon": 2, "time": 253402300800000}',
+]
+
+PAYLOADS = VALID + MALFORMED + HOSTILE
+
+
+@pytest.mark.parametrize('payload', PAYLOADS)
+def test_parse_datagram_matches_parse_location(payload):
+    assert _ingest.parse_datagram(payload, app.parse_location) == app.parse_location(payload)
+
+
+@pytest.mark.parametrize('payload', VALID + MALFORMED + HOSTILE[:12])
+def test_common_payloads_are_decided_in_c(payload):
+    def fallback(raw):
+        raise AssertionError(f"fallback inesperado para {raw!r}")
+
+    assert _ingest.parse_datagram(payload, fallback) == app.parse_location(payload)
+
+
+def test_valid_payloads_produce_rows():
+    for payload in VALID:
+        assert _ingest.parse_datagram(payload) is not None, payload
+
+
+def test_run_ingest_matches_parse_location():
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(('127.0.0.1', 0))
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    rows = queue.Queue()
+    threading.Thread(
+        target=_ingest.run_ingest,
+        args=(receiver.fileno(), rows, 8, 1500, app.parse_location),
+        daemon=True,
+    ).start()
+
+    payloads = [p for p in PAYLOADS if p]
+    for payload in payloads:
+        sender.sendto(payload, receiver.getsockname())
+    # Un último datagrama válido marca el final
+    sender.sendto(VALID[0], receiver.getsockname())
+
+    expected = [row for row in map(app.parse_location, payloads) if row is not None]
+    expected.append(app.parse_location(VALID[0]))
+    received = [rows.get(timeout=5) for _ in expected]
+    assert received == expected
+    assert rows.empty()
@@ -0,0 +1,64 @@
+"""La última ubicación publicada por el proceso de ingesta llega a los workers."""
+import os
+
+import pytest
+
+import app
+
+
+def test_read_before_publish(tmp_path):
+    path = str(tmp_path / 'latest')
+    assert app.SharedLatest(path).read() is None
+    app.SharedLatest(path).open_for_writing()
+    assert app.SharedLatest(path).read() is None
+
+
+def test_publish_is_visible_to_other_readers(tmp_path):
+    path = str(tmp_path / 'latest')
+    writer = app.SharedLatest(path)
+    writer.open_for_writing()
+    reader = app.SharedLatest(path)
+    writer.publish(4.60971, -74.08175, 1700000000000)
+    assert reader.read() == (4.60971, -74.08175, 1700000000000.0)
+    writer.publish(1, 2, 3)
+    assert reader.read() == (1.0, 2.0, 3.0)
+
+
+def test_writer_continues_sequence(tmp_path):
+    path = str(tmp_path / 'latest')
+    first = app.SharedLatest(path)
+    first.open_for_writing()
+    first.publish(1, 2, 3)
+    second = app.SharedLatest(path)
+    second.open_for_writing()
+    second.publish(4, 5, 6)
+    assert second._seq > first._seq
+    assert app.SharedLatest(path).read() == (4.0, 5.0, 6.0)
+
+
+def test_recovers_when_file_is_replaced(tmp_path):
+    path = str(tmp_path / 'latest')
+    writer = app.SharedLatest(path, recheck=0)
+    writer.open_for_writing()
+    reader = app.SharedLatest(path, recheck=0)
+    writer.publish(1, 2, 3)
+    assert reader.read() == (1.0, 2.0, 3.0)
+    os.unlink(path)
+    assert reader.read() is None
+    writer.publish(4, 5, 6)
+    assert reader.read() == (4.0, 5.0, 6.0)
+
+
+def test_endpoint_serves_published_fix(tmp_path, monkeypatch):
+    latest = app.SharedLatest(str(tmp_path / 'latest'))
+    latest.open_for_writing()
+    latest.publish(4.5, -74.25, 1700000000000)
+    monkeypatch.setattr(app, 'LATEST', latest)
+    monkeypatch.setattr(app, 'query_latest_location', lambda: pytest.fail("consultó la BD"))
+    response = app.app.test_client().get('/api/latest_location')
+    assert response.status_code == 200
+    assert response.get_json() == {
+        "latitude": 4.5,
+        "longitude": -74.25,
+        "timestamp": "2023-11-14T22:13:20+00:00",
+    }
@@ -0,0 +1,61 @@
+"""Reglas de app.parse_location; no necesitan la extensión _ingest."""
+import pytest
+
+import app
+
+
+@pytest.mark.parametrize('payload, expected', [
+    (b'{"lat": 4.60971, "lon": -74.08175, "time": 1700000000000}', (4.60971, -74.08175, 1700000000000)),
+    (b'{"time": 1.5e12, "lon": -0.0, "lat": 1E-3}', (0.001, -0.0, 1500000000000.0)),
+    (b'{"lat": 1, "lon": 2, "time": 3, "extra": {"lat": "x"}}', (1, 2, 3)),
+    (b'{"lat": 1, "lon": 2, "time": 0}', (1, 2, 0)),
+    (b'{"lat": 1, "lon": 2, "time": 253402300799999}', (1, 2, app.MAX_APP_TIME_MS)),
+])
+def test_valid_payloads(payload, expected):
+    row = app.parse_location(payload)
+    assert row[:3] == expected
+    assert [type(x) for x in row[:3]] == [type(x) for x in expected]
+    # full_data guarda el datagrama tal cual, como texto
+    assert row[3] == payload.decode('utf-8')
+
+
+@pytest.mark.parametrize('payload', [
+    b'{"lat": null, "lon": 2, "time": 3}',
+    b'{"lat": true, "lon": 2, "time": 3}',
+    b'{"lat": 1, "lon": false, "time": 3}',
+    b'{"lat": 1, "lon": 2, "time": true}',
+    b'{"lat": "1", "lon": 2, "time": 3}',
+    b'{"lat": [1], "lon": 2, "time": 3}',
+    b'{"lat": 1, "lon": {}, "time": 3}',
+    b'{"lat": 1, "lon": 2, "time": "1700000000000"}',
+])
+def test_non_number_fields_are_rejected(payload):
+    assert app.parse_location(payload) is None
+
+
+@pytest.mark.parametrize('payload', [
+    b'{"lat": 1, "lon": 2, "time": -1}',
+    b'{"lat": 1, "lon": 2, "time": -0.5}',
+    b'{"lat": 1, "lon": 2, "time": 253402300800000}',
+    b'{"lat": 1, "lon": 2, "time": 253402300799999.5}',
+    b'{"lat": 1, "lon": 2, "time": 1e15}',
+    b'{"lat": 1, "lon": 2, "time": 1e400}',
+    b'{"lat": 1, "lon": 2, "time": 123456789012345678901234}',
+])
+def test_time_out_of_range_is_rejected(payload):
+    assert app.parse_location(payload) is None
+
+
+@pytest.mark.parametrize('payload', [
+    b'',
+    b'garbage',
+    b'[1, 2, 3]',
+    b'{}',
+    b'{"lat": 1, "lon": 2}',
+    b'{"lat": 1, "lon": 2, "time": 3',
+    b'{"lat": NaN, "lon": 2, "time": 3}',
+    b'{"lat": Infinity, "lon": 2, "time": 3}',
+    b'{"lat": 1, "lon": 2, "time": 3, "s": "\xff"}',
+])
+def test_malformed_payloads_are_rejected(payload):
+    assert app.parse_location(payload) is None